@@ -1,46 +1,73 @@
 import asyncio
-import json
-import subprocess
+import sys
+from contextlib import AsyncExitStack
+
+import numpy as np
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
-async def call_mcp_tool(server_params, tool_name, parameters):
-    """Call an MCP tool using stdio transport."""
+try:
+    import orjson as _json  # C-accelerated JSON decode for tool payloads
+except ImportError:
+    import json as _json
+
+async def open_session(stack, server_params):
+    """Spawn an MCP server once and return an initialized, long-lived session."""
+    read, write = await stack.enter_async_context(stdio_client(server_params))
+    session = await stack.enter_async_context(ClientSession(read, write))
+    await session.initialize()
+    return session
+
+async def call_tool(session, tool_name, parameters):
+    """Call an MCP tool on an already-open session."""
     print(f"\n--> Calling {tool_name}...")
     try:
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                
-                result = await session.call_tool(tool_name, parameters)
-                print(f"<-- Response: {result.content}")
-                
-                # Extract the actual result from MCP response
-                if result.content and len(result.content) > 0:
-                    return result.content[0].text if hasattr(result.content[0], 'text') else result.content[0]
-                return None
-                
+        result = await session.call_tool(tool_name, parameters)
+
+        # Prefer structured content: the server already sends the parsed
+        # value, so there is no JSON text to re-decode on this side.
+        structured = getattr(result, "structuredContent", None)
+        if structured is not None:
+            print(f"<-- Response (structured): {structured}")
+            # FastMCP wraps non-object results as {"result": ...}
+            if isinstance(structured, dict) and set(structured) == {"result"}:
+                return structured["result"]
+            return structured
+
+        print(f"<-- Response: {result.content}")
+
+        # Fall back to extracting the text block from the MCP response
+        if result.content and len(result.content) > 0:
+            return result.content[0].text if hasattr(result.content[0], 'text') else result.content[0]
+        return None
+
     except Exception as e:
         print(f"<-- Error: {e}")
         return None
 
-async def collect_data_at_points(robot_server, points):
-    """Helper function to collect measurements at given design points."""
-    experimental_data = []
-    for i, point in enumerate(points):
-        print(f"  Collecting data at point {i+1}/{len(points)}: {point}")
-        robot_params = {"design_variables": point}
-        measurement = await call_mcp_tool(robot_server, "collect_measurement", robot_params)
-        if measurement is not None:
-            # Parse measurement if it's a string
-            if isinstance(measurement, str):
-                try:
-                    measurement = float(measurement)
-                except ValueError:
-                    print(f"Failed to parse measurement: {measurement}")
-                    continue
-            experimental_data.append({"vars": point, "measurement": measurement})
-    return experimental_data
+async def collect_data_at_points(robot_session, points):
+    """Collect measurements at the given design points in one batched call.
+
+    The whole point list goes out in a single collect_measurements RPC, so
+    the batch costs one round-trip instead of one per point.
+    """
+    print(f"  Requesting measurements for {len(points)} points in one batch...")
+    result = await call_tool(robot_session, "collect_measurements", {"design_points": points})
+    if result is None:
+        return []
+
+    # Parse measurements if they're in string format
+    if isinstance(result, str):
+        try:
+            result = _json.loads(result)
+        except ValueError:
+            print(f"Failed to parse measurements: {result}")
+            return []
+
+    return [
+        {"vars": point, "measurement": float(measurement)}
+        for point, measurement in zip(points, result)
+    ]
 
 async def main():
     """Two-phase optimization: DoE exploration + model-based optimization."""
@@ -48,26 +75,38 @@ async def main():
     print("   ENGINEERING OPTIMIZATION WORKFLOW")
     print("="*50)
     
-    # Server parameters
+    # Server parameters. Launch with the current interpreter directly:
+    # the client already runs inside the project environment, so going
+    # through "uv run" would just redo dependency resolution on every spawn.
     opt_server = StdioServerParameters(
-        command="uv", 
-        args=["run", "python", "optimization_server.py"]
+        command=sys.executable,
+        args=["optimization_server.py"]
     )
-    
+
     robot_server = StdioServerParameters(
-        command="uv", 
-        args=["run", "python", "robot_server.py"]
+        command=sys.executable,
+        args=["robot_server.py"]
     )
-    
+
+    # Spawn each server once and reuse the sessions for every tool call
+    # instead of paying subprocess startup + MCP handshake per call.
+    async with AsyncExitStack() as stack:
+        print("\nStarting MCP servers...")
+        opt_session = await open_session(stack, opt_server)
+        robot_session = await open_session(stack, robot_server)
+        await run_workflow(opt_session, robot_session)
+
+async def run_workflow(opt_session, robot_session):
+    """Run the optimization workflow against already-open MCP sessions."""
     # ===============================================
     # PHASE 1: DESIGN OF EXPERIMENTS (EXPLORATION)
     # ===============================================
     print("\nPHASE 1: Design of Experiments - Exploring Design Space")
     print("-" * 50)
-    
+
     # Generate DoE points for initial exploration
     doe_params = {"num_variables": 2, "num_levels": 4}
-    doe_points = await call_mcp_tool(opt_server, "suggest_doe_points", doe_params)
+    doe_points = await call_tool(opt_session, "suggest_doe_points", doe_params)
 
     if not doe_points:
         print("Could not retrieve DoE points. Exiting.")
@@ -76,8 +115,8 @@ async def main():
     # Parse the DoE points if they're in string format
     if isinstance(doe_points, str):
         try:
-            doe_points = json.loads(doe_points)
-        except json.JSONDecodeError:
+            doe_points = _json.loads(doe_points)
+        except ValueError:
             print("Failed to parse DoE points. Exiting.")
             return
 
@@ -85,7 +124,7 @@ async def main():
     
     # Collect data at all DoE points
     print("Collecting experimental data...")
-    doe_data = await collect_data_at_points(robot_server, doe_points)
+    doe_data = await collect_data_at_points(robot_session, doe_points)
     
     if not doe_data:
         print("No experimental data collected. Exiting.")
@@ -101,7 +140,7 @@ async def main():
     
     # Fit response surface model to DoE data
     rsm_params = {"data": doe_data}
-    rsm_result = await call_mcp_tool(opt_server, "fit_response_surface", rsm_params)
+    rsm_result = await call_tool(opt_session, "fit_response_surface", rsm_params)
 
     if not rsm_result:
         print("Failed to fit response surface model. Exiting.")
@@ -109,8 +148,8 @@ async def main():
 
     if isinstance(rsm_result, str):
         try:
-            rsm_result = json.loads(rsm_result)
-        except json.JSONDecodeError:
+            rsm_result = _json.loads(rsm_result)
+        except ValueError:
             print(f"Response Surface Result: {rsm_result}")
             return
 
@@ -126,7 +165,7 @@ async def main():
     
     # Find optimal point using the fitted model
     opt_params = {"model_coefficients": rsm_result["model_coefficients"]}
-    opt_result = await call_mcp_tool(opt_server, "optimize_from_model", opt_params)
+    opt_result = await call_tool(opt_session, "optimize_from_model", opt_params)
 
     if not opt_result:
         print("Failed to optimize from model. Exiting.")
@@ -134,8 +173,8 @@ async def main():
 
     if isinstance(opt_result, str):
         try:
-            opt_result = json.loads(opt_result)
-        except json.JSONDecodeError:
+            opt_result = _json.loads(opt_result)
+        except ValueError:
             print(f"Optimization Result: {opt_result}")
             return
 
@@ -153,12 +192,12 @@ async def main():
     
     # Generate refinement points around the predicted optimum
     ref_params = {"optimal_point": predicted_optimal, "num_points": 5, "radius": 0.1}
-    refinement_points = await call_mcp_tool(opt_server, "suggest_refinement_points", ref_params)
+    refinement_points = await call_tool(opt_session, "suggest_refinement_points", ref_params)
     
     if isinstance(refinement_points, str):
         try:
-            refinement_points = json.loads(refinement_points)
-        except json.JSONDecodeError:
+            refinement_points = _json.loads(refinement_points)
+        except ValueError:
             refinement_points = []
     
     if refinement_points:
@@ -166,11 +205,14 @@ async def main():
         
         # Collect data at refinement points
         print("Collecting refinement data...")
-        refinement_data = await collect_data_at_points(robot_server, refinement_points)
+        refinement_data = await collect_data_at_points(robot_session, refinement_points)
         
         # Find the best point from refinement data
         if refinement_data:
-            best_point = min(refinement_data, key=lambda x: x['measurement'])
+            measurements = np.fromiter(
+                (d['measurement'] for d in refinement_data),
+                dtype=float, count=len(refinement_data))
+            best_point = refinement_data[int(np.argmin(measurements))]
             print(f"Best refinement point: {best_point['vars']}")
             print(f"Best measured value: {best_point['measurement']:.4f}")
             
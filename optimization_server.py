@@ -1,43 +1,77 @@
 from fastmcp import FastMCP
+from functools import lru_cache
 import numpy as np
 from typing import List
 
 mcp = FastMCP("Engineering_Optimization_Server", dependencies=["numpy"])
 
-@mcp.tool()
-def suggest_doe_points(num_variables: int, num_levels: int) -> List[List[float]]:
-    """Generates a full factorial Design of Experiments (DoE)."""
+@lru_cache(maxsize=32)
+def _doe_grid(num_variables: int, num_levels: int) -> tuple:
+    """Full factorial grid, cached per (num_variables, num_levels).
+
+    The grid is deterministic, so repeated runs reuse it. Cached as nested
+    tuples so the stored value is hashable and can't be mutated by callers.
+    """
     levels = np.linspace(0, 1, num_levels)
     grids = np.meshgrid(*([levels] * num_variables))
-    points = np.vstack([grid.ravel() for grid in grids]).T
-    return points.tolist()
+    # One stack + reshape instead of per-grid ravel copies, a vstack, and a
+    # transpose that leaves the points non-contiguous
+    points = np.stack(grids, axis=-1).reshape(-1, num_variables)
+    return tuple(map(tuple, points))
 
 @mcp.tool()
-def fit_response_surface(data: List[dict]) -> dict:
-    """
-    Fits a quadratic response surface model to experimental data.
-    Returns model coefficients and goodness of fit metrics.
-    """
+def suggest_doe_points(num_variables: int, num_levels: int) -> List[List[float]]:
+    """Generates a full factorial Design of Experiments (DoE)."""
+    return [list(point) for point in _doe_grid(num_variables, num_levels)]
+
+def _fit_response_surface(data: List[dict]) -> dict:
+    """Quadratic response surface fit, shared by the tool and run_workflow."""
     # data is expected to be a list of dicts like {'vars': [x1, x2], 'measurement': y}
     x = np.array([d['vars'] for d in data])
     y = np.array([d['measurement'] for d in data])
 
     # Design matrix for a quadratic model with two variables (x1, x2)
     # Model: y = a*x1^2 + b*x2^2 + c*x1*x2 + d*x1 + e*x2 + f
-    A = np.c_[x[:, 0]**2, x[:, 1]**2, x[:, 0]*x[:, 1], x[:, 0], x[:, 1], np.ones(x.shape[0])]
+    # Filled column-by-column into one preallocated array to avoid the
+    # temporary column arrays and copy that np.c_ would materialize.
+    A = np.empty((x.shape[0], 6))
+    A[:, 0] = x[:, 0]**2
+    A[:, 1] = x[:, 1]**2
+    A[:, 2] = x[:, 0] * x[:, 1]
+    A[:, 3] = x[:, 0]
+    A[:, 4] = x[:, 1]
+    A[:, 5] = 1.0
 
-    # Solve for the model coefficients using least squares
-    try:
-        coeffs, residuals, rank, s = np.linalg.lstsq(A, y, rcond=None)
-        
-        # Calculate R-squared
-        y_pred = A @ coeffs
-        ss_res = np.sum((y - y_pred) ** 2)
-        ss_tot = np.sum((y - np.mean(y)) ** 2)
-        r_squared = 1 - (ss_res / ss_tot) if ss_tot > 0 else 0
-        
-    except np.linalg.LinAlgError:
-        return {"error": "Failed to fit the model. The data may be singular."}
+    coeffs = None
+
+    # Saturated design: exactly as many points as model coefficients, so the
+    # quadratic interpolates the data and one direct square solve replaces
+    # the whole least-squares fit (R^2 is 1 by construction).
+    if A.shape[0] == A.shape[1]:
+        try:
+            coeffs = np.linalg.solve(A, y)
+        except np.linalg.LinAlgError:
+            coeffs = None  # singular saturated design: fit below instead
+
+    # Solve the normal equations (A'A) coeffs = A'y: the Gram matrix is a
+    # fixed 6x6, so one small direct solve beats the general SVD in lstsq.
+    if coeffs is None:
+        try:
+            G = np.einsum('ni,nj->ij', A, A)
+            b = A.T @ y
+            coeffs = np.linalg.solve(G, b)
+        except np.linalg.LinAlgError:
+            # Singular Gram matrix (e.g. degenerate DoE): fall back to least squares
+            try:
+                coeffs, residuals, rank, s = np.linalg.lstsq(A, y, rcond=None)
+            except np.linalg.LinAlgError:
+                return {"error": "Failed to fit the model. The data may be singular."}
+
+    # Calculate R-squared (reuse the single predicted-response vector)
+    y_pred = A @ coeffs
+    ss_res = np.sum((y - y_pred) ** 2)
+    ss_tot = np.sum((y - np.mean(y)) ** 2)
+    r_squared = 1 - (ss_res / ss_tot) if ss_tot > 0 else 0
 
     return {
         "status": "Response Surface Model Fitted",
@@ -48,81 +82,149 @@ def fit_response_surface(data: List[dict]) -> dict:
         "coefficient_names": ["a (x1²)", "b (x2²)", "c (x1*x2)", "d (x1)", "e (x2)", "f (intercept)"]
     }
 
-@mcp.tool()
-def optimize_from_model(model_coefficients: List[float], bounds: List[List[float]] = None) -> dict:
-    """
-    Finds the optimal point using the fitted response surface model.
-    Uses gradient descent to find the minimum of the quadratic surface.
-    """
+def _optimize_from_model(model_coefficients: List[float], bounds: List[List[float]] = None) -> dict:
+    """Closed-form quadratic optimum, shared by the tool and run_workflow."""
     if bounds is None:
         bounds = [[0.0, 1.0], [0.0, 1.0]]  # Default bounds for x1 and x2
-    
-    coeffs = np.array(model_coefficients)
-    
+
+    a, b, c, d, e, f = model_coefficients
+    (lo1, hi1), (lo2, hi2) = bounds
+
     def objective_function(x):
         """Quadratic model: y = a*x1^2 + b*x2^2 + c*x1*x2 + d*x1 + e*x2 + f"""
         x1, x2 = x
-        return coeffs[0]*x1**2 + coeffs[1]*x2**2 + coeffs[2]*x1*x2 + coeffs[3]*x1 + coeffs[4]*x2 + coeffs[5]
-    
-    def gradient(x):
-        """Gradient of the quadratic model"""
-        x1, x2 = x
-        dx1 = 2*coeffs[0]*x1 + coeffs[2]*x2 + coeffs[3]
-        dx2 = 2*coeffs[1]*x2 + coeffs[2]*x1 + coeffs[4]
-        return np.array([dx1, dx2])
-    
-    # Simple gradient descent optimization
-    x = np.array([0.5, 0.5])  # Start from center
-    learning_rate = 0.1
-    max_iterations = 100
-    tolerance = 1e-6
-    
-    for i in range(max_iterations):
-        grad = gradient(x)
-        x_new = x - learning_rate * grad
-        
-        # Apply bounds constraints
-        x_new[0] = np.clip(x_new[0], bounds[0][0], bounds[0][1])
-        x_new[1] = np.clip(x_new[1], bounds[1][0], bounds[1][1])
-        
-        if np.linalg.norm(x_new - x) < tolerance:
-            break
-            
-        x = x_new
-    
-    optimal_value = objective_function(x)
-    
+        return a*x1**2 + b*x2**2 + c*x1*x2 + d*x1 + e*x2 + f
+
+    # Hessian and gradient-at-origin of the quadratic:
+    # grad(x) = H x + g with H = [[2a, c], [c, 2b]], g = [d, e]
+    H = np.array([[2*a, c], [c, 2*b]])
+    g = np.array([d, e])
+
+    candidates = []
+
+    # Interior stationary point (only a minimum if H is positive-definite)
+    try:
+        x_star = np.linalg.solve(H, -g)
+        if np.all(np.linalg.eigvalsh(H) > 0) and lo1 <= x_star[0] <= hi1 and lo2 <= x_star[1] <= hi2:
+            candidates.append(x_star)
+    except np.linalg.LinAlgError:
+        pass  # singular Hessian: fall through to the boundary candidates
+
+    # If the interior optimum is outside the bounds (or H isn't PD), the
+    # constrained minimum lies on the boundary: check the 1D closed-form
+    # stationary point along each edge plus the four corners.
+    for x1 in (lo1, hi1):
+        if b > 0:
+            x2 = np.clip(-(c*x1 + e) / (2*b), lo2, hi2)
+            candidates.append(np.array([x1, x2]))
+    for x2 in (lo2, hi2):
+        if a > 0:
+            x1 = np.clip(-(c*x2 + d) / (2*a), lo1, hi1)
+            candidates.append(np.array([x1, x2]))
+    for x1 in (lo1, hi1):
+        for x2 in (lo2, hi2):
+            candidates.append(np.array([x1, x2]))
+
+    values = [objective_function(x) for x in candidates]
+    best = int(np.argmin(values))
+
     return {
         "status": "Optimization Complete",
-        "optimal_point": x.tolist(),
-        "optimal_value": float(optimal_value),
-        "iterations": i + 1,
-        "converged": i < max_iterations - 1
+        "optimal_point": candidates[best].tolist(),
+        "optimal_value": float(values[best]),
+        "method": "closed-form",
+        "converged": True
     }
 
+def _suggest_refinement_points(optimal_point: List[float], num_points: int = 5, radius: float = 0.1) -> List[List[float]]:
+    """Refinement shell around the optimum, shared by the tool and run_workflow."""
+    center = np.asarray(optimal_point, dtype=float)
+    num_ring = max(num_points - 1, 0)
+
+    if center.shape[0] == 2:
+        # Evenly spaced on a circle around the optimum
+        angles = 2 * np.pi * np.arange(num_ring) / max(num_ring, 1)
+        offsets = radius * np.column_stack([np.cos(angles), np.sin(angles)])
+    else:
+        # Arbitrary dimension: normalized Gaussian directions give uniformly
+        # distributed points on the radius-r shell
+        directions = np.random.normal(size=(num_ring, center.shape[0]))
+        norms = np.linalg.norm(directions, axis=1, keepdims=True)
+        offsets = radius * directions / np.where(norms > 0, norms, 1.0)
+
+    # Ensure points are within bounds [0, 1]
+    ring = np.clip(center + offsets, 0.0, 1.0)
+
+    # The optimal point itself, then the surrounding shell
+    return [list(optimal_point)] + ring.tolist()
+
+@mcp.tool()
+def fit_response_surface(data: List[dict]) -> dict:
+    """
+    Fits a quadratic response surface model to experimental data.
+    Returns model coefficients and goodness of fit metrics.
+    """
+    return _fit_response_surface(data)
+
+@mcp.tool()
+def optimize_from_model(model_coefficients: List[float], bounds: List[List[float]] = None) -> dict:
+    """
+    Finds the optimal point using the fitted response surface model.
+    A quadratic surface has a closed-form stationary point (solve H x* = -g),
+    so no iterative descent is needed.
+    """
+    return _optimize_from_model(model_coefficients, bounds)
+
 @mcp.tool()
 def suggest_refinement_points(optimal_point: List[float], num_points: int = 5, radius: float = 0.1) -> List[List[float]]:
     """
     Suggests additional sampling points around the predicted optimum for refinement.
     Uses a small radius around the optimal point for local exploration.
     """
-    center = np.array(optimal_point)
-    points = []
-    
-    # Add the optimal point itself
-    points.append(optimal_point)
-    
-    # Generate points in a circle around the optimum
-    for i in range(num_points - 1):
-        angle = 2 * np.pi * i / (num_points - 1)
-        offset = radius * np.array([np.cos(angle), np.sin(angle)])
-        point = center + offset
-        
-        # Ensure points are within bounds [0, 1]
-        point = np.clip(point, 0.0, 1.0)
-        points.append(point.tolist())
-    
-    return points
+    return _suggest_refinement_points(optimal_point, num_points, radius)
+
+@mcp.tool()
+def run_workflow(num_variables: int = 2, num_levels: int = 4,
+                 num_refinement_points: int = 5, radius: float = 0.1) -> dict:
+    """
+    Runs the full DoE -> measure -> fit -> optimize -> refine pipeline in a
+    single tool call, collapsing the per-phase MCP round-trips into one RPC
+    for callers that don't need live per-phase updates.
+    """
+    # The robot simulator lives in this repo; import it lazily so the two
+    # servers stay independent unless the fused path is actually used.
+    from robot_server import _true_performance, rng
+
+    def measure(points):
+        pts = np.asarray(points, dtype=float)
+        noisy = _true_performance(pts[:, 0], pts[:, 1]) + rng.normal(0, 0.1, size=pts.shape[0])
+        return [{"vars": p.tolist(), "measurement": float(m)} for p, m in zip(pts, noisy)]
+
+    doe_points = [list(point) for point in _doe_grid(num_variables, num_levels)]
+    doe_data = measure(doe_points)
+
+    rsm_result = _fit_response_surface(doe_data)
+    if "error" in rsm_result:
+        return rsm_result
+
+    opt_result = _optimize_from_model(rsm_result["model_coefficients"])
+
+    refinement_points = _suggest_refinement_points(
+        opt_result["optimal_point"], num_refinement_points, radius)
+    refinement_data = measure(refinement_points)
+    measurements = np.fromiter(
+        (d["measurement"] for d in refinement_data),
+        dtype=float, count=len(refinement_data))
+    best_point = refinement_data[int(np.argmin(measurements))]
+
+    return {
+        "status": "Workflow Complete",
+        "doe_data": doe_data,
+        "model": rsm_result,
+        "optimization": opt_result,
+        "refinement_data": refinement_data,
+        "best_point": best_point,
+    }
 
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
@@ -2,8 +2,29 @@ from fastmcp import FastMCP
 import numpy as np
 from typing import List
 
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; without it the simulator just runs as plain NumPy
+    def njit(func=None, **kwargs):
+        if func is None:
+            return lambda f: f
+        return func
+
 mcp = FastMCP("Data_Collection_Robot", dependencies=["numpy"])
 
+# One Generator for the process: avoids touching the legacy global RNG state
+# on every measurement and uses the faster PCG64 bit generator
+rng = np.random.default_rng()
+
+@njit(cache=True)
+def _true_performance(x1, x2):
+    """The fictional 'true' response surface (JIT-compiled when numba is present).
+
+    Works elementwise, so it serves both the scalar and the batched tool.
+    """
+    return 0.5 * (x1 - 0.5)**2 + 0.8 * (x2 - 0.7)**2 + x1 * x2
+
 @mcp.tool()
 def collect_measurement(design_variables: List[float]) -> float:
     """
@@ -11,13 +32,29 @@ def collect_measurement(design_variables: List[float]) -> float:
     The 'true' performance is a simple function of the design variables.
     """
     x1, x2 = design_variables
-    # A fictional "true" response surface
-    true_performance = 0.5 * (x1 - 0.5)**2 + 0.8 * (x2 - 0.7)**2 + x1 * x2
-    
+    true_performance = _true_performance(x1, x2)
+
     # Add random measurement noise
-    noise = np.random.normal(0, 0.1) # Simulate sensor noise
-    
+    noise = rng.normal(0, 0.1) # Simulate sensor noise
+
     return true_performance + noise
 
+@mcp.tool()
+def collect_measurements(design_points: List[List[float]]) -> List[float]:
+    """
+    Simulates the robot measuring a whole batch of designs in one pass.
+    Vectorized with NumPy so N points cost one tool call instead of N.
+    """
+    if not design_points:
+        return []  # an empty batch is valid input, not an error
+
+    x = np.asarray(design_points, dtype=float)
+    true_performance = _true_performance(x[:, 0], x[:, 1])
+
+    # Independent sensor noise per measurement
+    noise = rng.normal(0, 0.1, size=x.shape[0])
+
+    return (true_performance + noise).tolist()
+
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
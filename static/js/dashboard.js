@@ -33,13 +33,18 @@ class OptimizationDashboard {
         const wsUrl = `${protocol}//${window.location.host}/ws`;
         
         this.websocket = new WebSocket(wsUrl);
-        
+        this.websocket.binaryType = 'arraybuffer';
+
         this.websocket.onopen = () => {
             this.addLogEntry('Connected to server', 'success');
         };
-        
+
         this.websocket.onmessage = (event) => {
-            const message = JSON.parse(event.data);
+            // The server sends binary MessagePack frames when available,
+            // JSON text otherwise
+            const message = event.data instanceof ArrayBuffer
+                ? MessagePack.decode(new Uint8Array(event.data))
+                : JSON.parse(event.data);
             this.handleWebSocketMessage(message);
         };
         
@@ -457,7 +462,7 @@ class OptimizationDashboard {
                 <div style="margin-top: 15px;">
                     <strong>Optimal Point:</strong> [${result.optimal_point.map(p => p.toFixed(4)).join(', ')}]<br>
                     <strong>Optimal Value:</strong> ${result.optimal_value.toFixed(4)}<br>
-                    <strong>Iterations:</strong> ${result.iterations}<br>
+                    <strong>Method:</strong> ${result.method}<br>
                     <strong>Converged:</strong> ${result.converged ? 'Yes' : 'No'}
                 </div>
             `;
@@ -1,16 +1,28 @@
 import asyncio
-import json
 import logging
+from contextlib import AsyncExitStack
 from typing import List, Dict, Any
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 from pathlib import Path
+import sys
+import numpy as np
 import uvicorn
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # fall back to JSON text frames
+
+try:
+    import orjson as _json  # C-accelerated JSON encode/decode
+except ImportError:
+    import json as _json
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -35,33 +47,95 @@ optimization_state = {
 # WebSocket connections
 connected_clients: List[WebSocket] = []
 
+# MCP server launch parameters, keyed by session name. The servers are
+# spawned with the current interpreter (we're already inside the project
+# environment, so "uv run" would only add resolver overhead) and then live
+# as daemons for the rest of the web server's lifetime.
+SERVER_PARAMS = {
+    "optimization": StdioServerParameters(
+        command=sys.executable,
+        args=["optimization_server.py"]
+    ),
+    "robot": StdioServerParameters(
+        command=sys.executable,
+        args=["robot_server.py"]
+    ),
+}
+
+# Long-lived MCP sessions, spawned lazily on the first optimization run and
+# reused for every subsequent tool call (no per-call subprocess startup).
+# The AsyncExitStack holding them is owned by the worker task (see
+# optimization_worker): anyio cancel scopes are task-bound, so the sessions
+# must be opened and closed by the same task.
+sessions: Dict[str, ClientSession] = {}
+
+async def get_session(stack: AsyncExitStack, name: str) -> ClientSession:
+    """Return the long-lived MCP session for a server, spawning it if needed."""
+    if name not in sessions:
+        params = SERVER_PARAMS[name]
+        read, write = await stack.enter_async_context(stdio_client(params))
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await session.initialize()
+        sessions[name] = session
+        logger.info(f"Started MCP server session: {name}")
+    return sessions[name]
+
+def encode_message(message: Dict[str, Any]):
+    """Encode one frame shared by all recipients.
+
+    A single binary MessagePack frame when msgpack is installed (smaller and
+    cheaper to encode/decode than JSON text), otherwise a JSON string.
+    """
+    if msgpack is not None:
+        return msgpack.packb(message)
+    payload = _json.dumps(message)
+    # orjson produces bytes; WebSocket text frames need str
+    return payload.decode() if isinstance(payload, bytes) else payload
+
+async def send_payload(client: WebSocket, payload):
+    """Send an already-encoded frame to one WebSocket client."""
+    if isinstance(payload, bytes):
+        await client.send_bytes(payload)
+    else:
+        await client.send_text(payload)
+
 async def broadcast_update(message: Dict[str, Any]):
-    """Broadcast updates to all connected WebSocket clients."""
+    """Broadcast updates to all connected WebSocket clients.
+
+    Sends to every client concurrently, so one slow connection doesn't
+    delay the others.
+    """
     if connected_clients:
-        message_str = json.dumps(message)
-        disconnected = []
-        for client in connected_clients:
-            try:
-                await client.send_text(message_str)
-            except:
-                disconnected.append(client)
-        
-        # Remove disconnected clients
-        for client in disconnected:
-            connected_clients.remove(client)
+        payload = encode_message(message)
+        clients = list(connected_clients)
+        results = await asyncio.gather(
+            *(send_payload(client, payload) for client in clients),
+            return_exceptions=True
+        )
+
+        # Remove clients whose send failed (disconnected mid-broadcast)
+        for client, result in zip(clients, results):
+            if isinstance(result, Exception) and client in connected_clients:
+                connected_clients.remove(client)
 
-async def call_mcp_tool(server_params, tool_name, parameters):
-    """Call an MCP tool using stdio transport."""
+async def call_tool(session, tool_name, parameters):
+    """Call an MCP tool on an already-open session."""
     try:
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                result = await session.call_tool(tool_name, parameters)
-                
-                if result.content and len(result.content) > 0:
-                    return result.content[0].text if hasattr(result.content[0], 'text') else result.content[0]
-                return None
-                
+        result = await session.call_tool(tool_name, parameters)
+
+        # Prefer structured content: the server already sends the parsed
+        # value, so there is no JSON text to re-decode on this side.
+        structured = getattr(result, "structuredContent", None)
+        if structured is not None:
+            # FastMCP wraps non-object results as {"result": ...}
+            if isinstance(structured, dict) and set(structured) == {"result"}:
+                return structured["result"]
+            return structured
+
+        if result.content and len(result.content) > 0:
+            return result.content[0].text if hasattr(result.content[0], 'text') else result.content[0]
+        return None
+
     except Exception as e:
         await broadcast_update({
             "type": "error",
@@ -69,40 +143,57 @@ async def call_mcp_tool(server_params, tool_name, parameters):
         })
         return None
 
-async def collect_data_at_points(robot_server, points):
-    """Helper function to collect measurements at given design points."""
+async def parse_result(result):
+    """Decode a JSON tool result without blocking the event loop.
+
+    The numeric heavy lifting happens inside the MCP server processes; the
+    CPU-bound work left on this loop is decoding their payloads, so push it
+    to a worker thread.
+    """
+    if isinstance(result, str):
+        return await asyncio.to_thread(_json.loads, result)
+    return result
+
+async def collect_data_at_points(robot_session, points):
+    """Collect measurements at the given design points in one batched call.
+
+    The whole point list goes out in a single collect_measurements RPC, so
+    the batch costs one round-trip instead of one per point. Each resulting
+    data point is still broadcast individually for the dashboard.
+    """
+    await broadcast_update({
+        "type": "data_collection",
+        "point_index": 1,
+        "total_points": len(points),
+        "message": f"Collecting data at {len(points)} points in one batch"
+    })
+
+    result = await call_tool(robot_session, "collect_measurements", {"design_points": points})
+    if result is None:
+        return []
+
+    try:
+        result = await parse_result(result)
+    except ValueError:
+        return []
+
     experimental_data = []
-    for i, point in enumerate(points):
+    for i, (point, measurement) in enumerate(zip(points, result)):
+        data_point = {"vars": point, "measurement": float(measurement)}
+        experimental_data.append(data_point)
+
         await broadcast_update({
-            "type": "data_collection",
+            "type": "data_collected",
+            "point": point,
+            "measurement": data_point["measurement"],
             "point_index": i + 1,
             "total_points": len(points),
-            "point": point,
-            "message": f"Collecting data at point {i+1}/{len(points)}"
+            "data_point": data_point
         })
-        
-        robot_params = {"design_variables": point}
-        measurement = await call_mcp_tool(robot_server, "collect_measurement", robot_params)
-        if measurement is not None:
-            if isinstance(measurement, str):
-                try:
-                    measurement = float(measurement)
-                except ValueError:
-                    continue
-            
-            data_point = {"vars": point, "measurement": measurement}
-            experimental_data.append(data_point)
-            
-            await broadcast_update({
-                "type": "data_collected",
-                "point": point,
-                "measurement": measurement,
-                "data_point": data_point
-            })
-    
+
     return experimental_data
 
-async def run_optimization():
+async def run_optimization(stack: AsyncExitStack):
     """Run the complete optimization workflow."""
     global optimization_state
     
@@ -127,17 +218,10 @@ async def run_optimization():
             "message": "Starting optimization workflow..."
         })
         
-        # Server parameters
-        opt_server = StdioServerParameters(
-            command="uv", 
-            args=["run", "python", "optimization_server.py"]
-        )
-        
-        robot_server = StdioServerParameters(
-            command="uv", 
-            args=["run", "python", "robot_server.py"]
-        )
-        
+        # Reuse long-lived MCP sessions (spawned on first run)
+        opt_session = await get_session(stack, "optimization")
+        robot_session = await get_session(stack, "robot")
+
         # Phase 1: Design of Experiments
         optimization_state["phase"] = "doe"
         await broadcast_update({
@@ -147,10 +231,9 @@ async def run_optimization():
         })
         
         doe_params = {"num_variables": 2, "num_levels": 4}
-        doe_points = await call_mcp_tool(opt_server, "suggest_doe_points", doe_params)
+        doe_points = await call_tool(opt_session, "suggest_doe_points", doe_params)
         
-        if isinstance(doe_points, str):
-            doe_points = json.loads(doe_points)
+        doe_points = await parse_result(doe_points)
         
         optimization_state["total_points"] = len(doe_points)
         
@@ -161,7 +244,7 @@ async def run_optimization():
         })
         
         # Collect DoE data
-        doe_data = await collect_data_at_points(robot_server, doe_points)
+        doe_data = await collect_data_at_points(robot_session, doe_points)
         optimization_state["data_points"] = doe_data
         
         # Phase 2: Response Surface Modeling
@@ -173,10 +256,9 @@ async def run_optimization():
         })
         
         rsm_params = {"data": doe_data}
-        rsm_result = await call_mcp_tool(opt_server, "fit_response_surface", rsm_params)
+        rsm_result = await call_tool(opt_session, "fit_response_surface", rsm_params)
         
-        if isinstance(rsm_result, str):
-            rsm_result = json.loads(rsm_result)
+        rsm_result = await parse_result(rsm_result)
         
         optimization_state["model_results"] = rsm_result
         
@@ -195,10 +277,9 @@ async def run_optimization():
         })
         
         opt_params = {"model_coefficients": rsm_result["model_coefficients"]}
-        opt_result = await call_mcp_tool(opt_server, "optimize_from_model", opt_params)
+        opt_result = await call_tool(opt_session, "optimize_from_model", opt_params)
         
-        if isinstance(opt_result, str):
-            opt_result = json.loads(opt_result)
+        opt_result = await parse_result(opt_result)
         
         optimization_state["optimization_results"] = opt_result
         
@@ -221,15 +302,17 @@ async def run_optimization():
             "num_points": 5, 
             "radius": 0.1
         }
-        refinement_points = await call_mcp_tool(opt_server, "suggest_refinement_points", ref_params)
+        refinement_points = await call_tool(opt_session, "suggest_refinement_points", ref_params)
         
-        if isinstance(refinement_points, str):
-            refinement_points = json.loads(refinement_points)
+        refinement_points = await parse_result(refinement_points)
         
-        refinement_data = await collect_data_at_points(robot_server, refinement_points)
+        refinement_data = await collect_data_at_points(robot_session, refinement_points)
         
         if refinement_data:
-            best_point = min(refinement_data, key=lambda x: x['measurement'])
+            measurements = np.fromiter(
+                (d['measurement'] for d in refinement_data),
+                dtype=float, count=len(refinement_data))
+            best_point = refinement_data[int(np.argmin(measurements))]
             
             await broadcast_update({
                 "type": "refinement_complete",
@@ -264,12 +347,45 @@ async def run_optimization():
             "message": f"Optimization failed: {str(e)}"
         })
 
+# Start requests funnel through a single-slot queue consumed by one worker
+# task, so spam-clicking "start" can't launch overlapping workflows: at most
+# one run is in progress and one is pending.
+run_queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+worker_task = None
+
+async def optimization_worker():
+    """Consume queued start requests and run workflows one at a time.
+
+    Also owns the exit stack holding the MCP sessions, so the stdio
+    contexts are entered and exited by this task; they unwind here when
+    shutdown cancels the worker.
+    """
+    async with AsyncExitStack() as stack:
+        while True:
+            await run_queue.get()
+            try:
+                await run_optimization(stack)
+            finally:
+                run_queue.task_done()
+
+def request_optimization() -> bool:
+    """Queue an optimization run; returns False if one is already pending."""
+    global worker_task
+    if worker_task is None:
+        worker_task = asyncio.create_task(optimization_worker())
+    try:
+        run_queue.put_nowait(None)
+        return True
+    except asyncio.QueueFull:
+        return False
+
 @app.get("/", response_class=HTMLResponse)
 async def get_dashboard():
     """Serve the main dashboard page."""
     html_path = Path("templates/index.html")
     if html_path.exists():
-        return HTMLResponse(content=html_path.read_text())
+        # Blocking file I/O goes to a worker thread, not the event loop
+        return HTMLResponse(content=await asyncio.to_thread(html_path.read_text))
     else:
         return HTMLResponse(content="""
         <!DOCTYPE html>
@@ -293,7 +409,7 @@ async def websocket_endpoint(websocket: WebSocket):
     
     # Send current state to new client
     try:
-        await websocket.send_text(json.dumps({
+        await send_payload(websocket, encode_message({
             "type": "state_update",
             "state": optimization_state
         }))
@@ -303,12 +419,18 @@ async def websocket_endpoint(websocket: WebSocket):
     try:
         while True:
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = _json.loads(data)
             logger.info(f"Received WebSocket message: {message}")
             
             if message.get("action") == "start_optimization":
-                logger.info("Starting optimization from WebSocket request")
-                asyncio.create_task(run_optimization())
+                if request_optimization():
+                    logger.info("Queued optimization run from WebSocket request")
+                else:
+                    logger.info("Optimization already pending; ignoring start request")
+                    await broadcast_update({
+                        "type": "info",
+                        "message": "Optimization already queued - ignoring extra start request"
+                    })
             elif message.get("action") == "reset":
                 logger.info("Resetting system from WebSocket request")
                 optimization_state = {
@@ -336,5 +458,31 @@ async def get_state():
     """Get current optimization state."""
     return optimization_state
 
+@app.on_event("shutdown")
+async def shutdown_mcp_sessions():
+    """Stop the worker task; its exit stack closes the MCP sessions."""
+    global worker_task
+    if worker_task is not None:
+        worker_task.cancel()
+        try:
+            await worker_task
+        except asyncio.CancelledError:
+            pass
+        worker_task = None
+    sessions.clear()
+
 if __name__ == "__main__":
-    uvicorn.run("web_server:app", host="0.0.0.0", port=8080, reload=True)
\ No newline at end of file
+    # Dashboard traffic is many small, latency-sensitive update frames:
+    # skip per-message deflate (compression latency dwarfs the payload) and
+    # allow large frames for full-state snapshots. uvicorn already sets
+    # TCP_NODELAY on accepted sockets, and the MCP stdio pipes are plain OS
+    # pipes with no Nagle batching to disable.
+    uvicorn.run(
+        "web_server:app",
+        host="0.0.0.0",
+        port=8080,
+        reload=True,
+        ws="websockets",
+        ws_per_message_deflate=False,
+        ws_max_size=16 * 1024 * 1024,
+    )
\ No newline at end of file